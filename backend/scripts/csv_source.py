@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+"""
+Source CSV loading shared by the DC and BlueDart generation scripts
+Uses pyarrow's multithreaded CSV reader when installed, pandas otherwise
+"""
+
+import pandas as pd
+
+try:
+    # Optional: pyarrow's multithreaded CSV reader is much faster than pandas' parser
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:
+    pa = None
+    pacsv = None
+
+HAVE_PYARROW = pacsv is not None
+
+def read_source_csv(csv_file_path, string_columns=()):
+    """
+    Load the source CSV into a DataFrame
+    Columns in string_columns are always read as text (no number/date/bool inference);
+    empty fields come back as missing values with either reader
+    """
+    if not HAVE_PYARROW:
+        return pd.read_csv(csv_file_path, dtype={col: str for col in string_columns})
+
+    table = pacsv.read_csv(
+        csv_file_path,
+        read_options=pacsv.ReadOptions(use_threads=True),
+        # Multi-line cells (e.g. addresses) are quoted, so newlines can appear inside values
+        parse_options=pacsv.ParseOptions(newlines_in_values=True),
+        convert_options=pacsv.ConvertOptions(
+            strings_can_be_null=True,
+            column_types={col: pa.string() for col in string_columns},
+        ),
+    )
+    # Plain (non-ArrowDtype) columns keep missing values as NaN/None, like pd.read_csv
+    return table.to_pandas()
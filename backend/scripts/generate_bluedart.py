@@ -7,17 +7,82 @@ Based on the working Python script provided by user
 import os
 import sys
 import json
+import re
 import csv
+import hashlib
+import itertools
+import numpy as np
 import pandas as pd
 from datetime import datetime
 
-def generate_bluedart_file(csv_file_path, output_dir, counter_dir):
+from csv_source import HAVE_PYARROW, read_source_csv
+
+class HashingWriter:
+    """Text writer that UTF-8 encodes into a binary file while counting and hashing the bytes"""
+    
+    def __init__(self, raw):
+        self.raw = raw
+        self.bytes_written = 0
+        self._hasher = hashlib.blake2b()
+    
+    def write(self, text):
+        data = text.encode("utf-8")
+        self._hasher.update(data)
+        self.bytes_written += len(data)
+        return self.raw.write(data)
+    
+    def hexdigest(self):
+        return self._hasher.hexdigest()
+
+# Any run of whitespace (including newlines and tabs) in addresses becomes one space
+_WS_RE = re.compile(r"\s+")
+
+# Source columns read by the generator, cleaned up front as stripped strings
+SOURCE_COLUMNS = ["Full Name", "Street Address", "Landmark", "Mobile Number", "Postal Code"]
+
+OUTPUT_COLUMNS = [
+    "Reference No",
+    "Billing Area",
+    "Billing Customer Code",
+    "Pickup Date",
+    "Pickup Time",
+    "Shipper Name",
+    "Pickup address",
+    "Pickup pincode",
+    "Company Name",
+    "Delivery address",
+    "Delivery Pincode",
+    "Product Code",
+    "Product Type",
+    "Pack Type",
+    "Piece Count",
+    "Actual Weight",
+    "Declared Value",
+    "Register Pickup",
+    "Length",
+    "Breadth",
+    "Height",
+    "To Pay Customer",
+    "Sender",
+    "Sender mobile",
+    "Receiver Telephone",
+    "Receiver mobile",
+    "Receiver Name",
+    "Invoice No",
+    "Special Instruction",
+    "Commodity Detail 1",
+    "Commodity Detail 2",
+    "Commodity Detail 3",
+]
+
+def generate_bluedart_file(csv_file_path, output_dir, counter_dir, write_feather=False):
     """
     Generate BlueDart file from CSV data using the exact working logic
     Args:
         csv_file_path: Path to input CSV file
         output_dir: Directory to save the generated BlueDart file
         counter_dir: Directory to store the persistent counter file
+        write_feather: Also write a .feather copy next to the CSV (needs pyarrow)
     Returns: dict with success status and file path
     """
     try:
@@ -44,174 +109,146 @@ def generate_bluedart_file(csv_file_path, output_dir, counter_dir):
         today_folder = today.strftime("%d%m%Y")    # ddmmyyyy
         
         # ====== READ SOURCE CSV ======
-        df_src = pd.read_csv(csv_file_path)
+        df_src = read_source_csv(csv_file_path, SOURCE_COLUMNS)
         if df_src.shape[0] == 0:
             raise ValueError("CSV has no data rows.")
         
         print(f"[SUCCESS] Loaded {len(df_src)} rows from source")
         print("[INFO] Columns:", df_src.columns.tolist())
         
+        # ====== CLEAN SOURCE COLUMNS ONCE ======
+        if "Landmark" not in df_src.columns:
+            df_src["Landmark"] = ""
+        for col in SOURCE_COLUMNS:
+            df_src[col] = df_src[col].astype("string").fillna("").str.strip()
+        
+        # Clean up landmark - remove 'nan' values
+        df_src["Landmark"] = df_src["Landmark"].mask(df_src["Landmark"].str.lower().eq("nan"), "")
+        
         # ====== LOAD LAST USED REF NO (PERSISTENT) ======
         counter_file = os.path.join(counter_dir, "ref_counter.txt")
-        if os.path.isfile(counter_file):
+        try:
             with open(counter_file, "r", encoding="utf-8") as f:
-                last_used = f.read().strip()
-            try:
-                last_ref_no = int(last_used)
-            except ValueError:
-                last_ref_no = 0
-        else:
-            last_ref_no = 0  # first time: start from 0
+                last_ref_no = int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            last_ref_no = 0  # first time (or unreadable counter): start from 0
         
         print(f"[INFO] Last used reference number: {last_ref_no:03d}")
         
-        rows_out = []
-        current_ref_no = last_ref_no
+        # ====== BUILD OUTPUT COLUMNS (VECTORIZED) ======
+        n = len(df_src)
+        ref_nos = np.arange(last_ref_no + 1, last_ref_no + 1 + n)
+        current_ref_no = last_ref_no + n
         
-        for idx, row in df_src.iterrows():
-            try:
-                current_ref_no += 1  # increment for each record
-                
-                full_name = str(row["Full Name"]).strip()
-                email = str(row["Email"]).strip()
-                street = str(row["Street Address"]).strip()
-                landmark = str(row.get("Landmark", "")).strip()
-                
-                # Clean up landmark - remove 'nan' values
-                if landmark.lower() == 'nan' or landmark == '':
-                    landmark = ""
-                
-                # Build delivery address - clean format without newlines
-                # Remove any newlines, tabs, and extra spaces
-                street = street.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-                landmark = landmark.replace('\n', ' ').replace('\r', ' ').replace('\t', ' ')
-                
-                delivery_address = street
-                if landmark:
-                    delivery_address = f"{street}, {landmark}"
-                
-                # Clean up the delivery address - remove multiple spaces
-                delivery_address = ' '.join(delivery_address.split())
-                
-                mobile = str(row["Mobile Number"]).strip()
-                phone = mobile
-                pincode = str(row["Postal Code"]).strip()
-                
-                # Reference / Invoice like LGS-INV-001, LGS-INV-002, ...
-                ref_text = f"LGS-INV-{current_ref_no:03d}"
-                
-                out_row = {
-                    "Reference No": ref_text,
-                    "Billing Area": BILLING_AREA,
-                    "Billing Customer Code": BILLING_CUSTOMER_CODE,
-                    "Pickup Date": pickup_date,
-                    "Pickup Time": PICKUP_TIME,
-                    "Shipper Name": SHIPPER_NAME,
-                    "Pickup address": PICKUP_ADDRESS,
-                    "Pickup pincode": PICKUP_PIN,
-                    "Company Name": full_name,
-                    "Delivery address": delivery_address,
-                    "Delivery Pincode": pincode,
-                    "Product Code": "",
-                    "Product Type": "",
-                    "Pack Type": PACK_TYPE,
-                    "Piece Count": PIECE_COUNT,
-                    "Actual Weight": "",
-                    "Declared Value": "",
-                    "Register Pickup": REGISTER_PICKUP,
-                    "Length": "",
-                    "Breadth": "",
-                    "Height": "",
-                    "To Pay Customer": TO_PAY_CUSTOMER,
-                    "Sender": SENDER,
-                    "Sender mobile": SENDER_MOBILE,
-                    "Receiver Telephone": phone,
-                    "Receiver mobile": mobile,
-                    "Receiver Name": full_name,
-                    "Invoice No": ref_text,
-                    "Special Instruction": "",
-                    "Commodity Detail 1": "",
-                    "Commodity Detail 2": "",
-                    "Commodity Detail 3": "",
-                }
-                
-                rows_out.append(out_row)
-                print(f"[PROCESSED] {idx + 1}: {full_name} -> {ref_text}")
-                
-            except Exception as e:
-                print(f"[ERROR] Error processing row {idx + 1}: {str(e)}")
-                continue
+        # Reference / Invoice like LGS-INV-001, LGS-INV-002, ...
+        # (zero-padded to at least 3 digits; astype(str) sizes the dtype so 1000+ is not truncated)
+        ref_text = np.char.add("LGS-INV-", np.char.zfill(ref_nos.astype(str), 3))
         
-        # ====== SAVE CSV ======
-        df_out = pd.DataFrame(rows_out, columns=[
-            "Reference No",
-            "Billing Area", 
-            "Billing Customer Code",
-            "Pickup Date",
-            "Pickup Time",
-            "Shipper Name",
-            "Pickup address",
-            "Pickup pincode",
-            "Company Name",
-            "Delivery address",
-            "Delivery Pincode",
-            "Product Code",
-            "Product Type",
-            "Pack Type",
-            "Piece Count",
-            "Actual Weight",
-            "Declared Value",
-            "Register Pickup",
-            "Length",
-            "Breadth",
-            "Height",
-            "To Pay Customer",
-            "Sender",
-            "Sender mobile",
-            "Receiver Telephone",
-            "Receiver mobile",
-            "Receiver Name",
-            "Invoice No",
-            "Special Instruction",
-            "Commodity Detail 1",
-            "Commodity Detail 2",
-            "Commodity Detail 3",
-        ])
+        full_name = df_src["Full Name"]
+        mobile = df_src["Mobile Number"]
+        pincode = df_src["Postal Code"]
+        
+        # Build delivery address - single line, whitespace runs (newlines, tabs) collapsed
+        street = df_src["Street Address"]
+        landmark = df_src["Landmark"]
+        delivery_address = street.where(landmark == "", street + ", " + landmark)
+        delivery_address = delivery_address.str.replace(_WS_RE, " ", regex=True).str.strip()
+        
+        out_columns = {
+            "Reference No": ref_text,
+            "Billing Area": BILLING_AREA,
+            "Billing Customer Code": BILLING_CUSTOMER_CODE,
+            "Pickup Date": pickup_date,
+            "Pickup Time": PICKUP_TIME,
+            "Shipper Name": SHIPPER_NAME,
+            "Pickup address": PICKUP_ADDRESS,
+            "Pickup pincode": PICKUP_PIN,
+            "Company Name": full_name,
+            "Delivery address": delivery_address,
+            "Delivery Pincode": pincode,
+            "Product Code": "",
+            "Product Type": "",
+            "Pack Type": PACK_TYPE,
+            "Piece Count": PIECE_COUNT,
+            "Actual Weight": "",
+            "Declared Value": "",
+            "Register Pickup": REGISTER_PICKUP,
+            "Length": "",
+            "Breadth": "",
+            "Height": "",
+            "To Pay Customer": TO_PAY_CUSTOMER,
+            "Sender": SENDER,
+            "Sender mobile": SENDER_MOBILE,
+            "Receiver Telephone": mobile,
+            "Receiver mobile": mobile,
+            "Receiver Name": full_name,
+            "Invoice No": ref_text,
+            "Special Instruction": "",
+            "Commodity Detail 1": "",
+            "Commodity Detail 2": "",
+            "Commodity Detail 3": "",
+        }
+        
+        # Constant columns are repeated lazily; per-row columns are zipped as-is.
+        # Rows are produced on demand while writing, never held as a list.
+        rows = zip(*(
+            itertools.repeat(col) if np.isscalar(col) else col.tolist()
+            for col in (out_columns[name] for name in OUTPUT_COLUMNS)
+        ))
         
+        print(f"[PROCESSED] {n} rows: {ref_text[0]} -> {ref_text[-1]}")
+        
+        # ====== SAVE CSV ======
         out_file_name = f"Bluedart_AWB_{today_folder}.csv"
         out_full_path = os.path.join(output_dir, out_file_name)
         
-        # Save CSV with proper encoding and quoting to handle special characters
-        df_out.to_csv(out_full_path, index=False, encoding="utf-8", lineterminator='\n', quoting=csv.QUOTE_ALL)
+        # Save CSV with proper encoding and quoting to handle special characters.
+        # Size and checksum are tracked while writing instead of re-reading the file.
+        with open(out_full_path, "wb") as f:
+            out = HashingWriter(f)
+            writer = csv.writer(out, quoting=csv.QUOTE_ALL, lineterminator="\n")
+            writer.writerow(OUTPUT_COLUMNS)
+            writer.writerows(rows)
         
         print(f"[SUCCESS] Bluedart CSV created at: {out_full_path}")
+        print(f"[INFO] File size: {out.bytes_written} bytes, blake2b: {out.hexdigest()[:16]}")
         
-        # Validate the generated file
-        if os.path.exists(out_full_path):
-            file_size = os.path.getsize(out_full_path)
-            print(f"[INFO] File size: {file_size} bytes")
-            
-            # Read first few lines to validate
-            with open(out_full_path, 'r', encoding='utf-8') as f:
-                first_lines = [f.readline().strip() for _ in range(3)]
-                print(f"[INFO] First 3 lines:")
-                for i, line in enumerate(first_lines, 1):
-                    print(f"  Line {i}: {line[:100]}...")
-        else:
-            raise FileNotFoundError(f"Generated file not found: {out_full_path}")
+        # ====== OPTIONAL FEATHER COPY ======
+        # The CSV stays canonical for BlueDart; the feather copy is for faster re-imports
+        feather_path = None
+        if write_feather:
+            if not HAVE_PYARROW:
+                print("[WARNING] pyarrow is not installed, skipping feather output")
+            else:
+                try:
+                    df_out = pd.DataFrame(
+                        {name: out_columns[name] for name in OUTPUT_COLUMNS},
+                        index=df_src.index,
+                    ).reset_index(drop=True)
+                    feather_path = os.path.splitext(out_full_path)[0] + ".feather"
+                    df_out.to_feather(feather_path)
+                    print(f"[SUCCESS] Feather copy created at: {feather_path}")
+                except Exception as e:
+                    feather_path = None
+                    print(f"[WARNING] Could not write feather copy: {str(e)}")
         
         # ====== SAVE UPDATED COUNTER ======
-        with open(counter_file, "w", encoding="utf-8") as f:
-            f.write(str(current_ref_no))
-        
-        print(f"[INFO] New last used reference number stored: {current_ref_no:03d}")
+        # Write to a temp file and swap it in so a crash never leaves a partial counter
+        if current_ref_no != last_ref_no:
+            tmp_counter_file = counter_file + ".tmp"
+            with open(tmp_counter_file, "w", encoding="utf-8") as f:
+                f.write(str(current_ref_no))
+            os.replace(tmp_counter_file, counter_file)
+            
+            print(f"[INFO] New last used reference number stored: {current_ref_no:03d}")
         
         return {
             'success': True,
-            'message': f'Generated BlueDart file with {len(rows_out)} records successfully',
+            'message': f'Generated BlueDart file with {n} records successfully',
             'file': out_full_path,
             'filename': out_file_name,
-            'count': len(rows_out)
+            'feather_file': feather_path,
+            'count': n
         }
         
     except Exception as e:
@@ -222,6 +259,7 @@ def generate_bluedart_file(csv_file_path, output_dir, counter_dir):
             'message': error_msg,
             'file': None,
             'filename': None,
+            'feather_file': None,
             'count': 0
         }
 
@@ -247,7 +285,9 @@ def main():
         sys.exit(1)
     
     # Generate BlueDart file
-    result = generate_bluedart_file(csv_file, output_dir, counter_dir)
+    # Set LOGOGEAR_BLUEDART_FEATHER=1 to also write a feather copy of the output
+    write_feather = os.environ.get('LOGOGEAR_BLUEDART_FEATHER') == '1'
+    result = generate_bluedart_file(csv_file, output_dir, counter_dir, write_feather)
     
     # Output result as JSON for Node.js to parse
     print("RESULT_JSON:", json.dumps(result))
@@ -3,16 +3,59 @@
 DC Generation Script for Logogear Portal
 Based on the working Python script provided by user
 Preserves all images, logos, and formatting from the template
+Renders the template once with openpyxl, then writes each DC in a worker
+process by patching customer values into a copy of the rendered XML
 """
 
-import pandas as pd
 from openpyxl import load_workbook
 from datetime import datetime
+import io
 import os
+import re
 import sys
 import json
-from openpyxl.cell.cell import MergedCell
-import shutil
+import zipfile
+from xml.sax.saxutils import escape
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from openpyxl.cell.cell import MergedCell, ILLEGAL_CHARACTERS_RE
+from openpyxl.utils.exceptions import IllegalCharacterError
+
+from csv_source import read_source_csv
+
+# Per-row progress output is only printed when LOGOGEAR_VERBOSE=1
+VERBOSE = os.environ.get('LOGOGEAR_VERBOSE') == '1'
+
+# Source columns read for each DC, with the value used when the column is absent
+SOURCE_COLUMNS = {
+    'Full Name': '',
+    'Street Address': '',
+    'Landmark': '',
+    'City': '',
+    'State/Province': '',
+    'Postal Code': '',
+    'Country': 'India',
+    'Mobile Number': '',
+}
+
+# TO section rows (column C onwards) that receive per-customer data, keyed by placeholder field
+_TO_SECTION_FIELDS = (
+    (3, 'NAME'),
+    (4, 'ADDRESS'),
+    (5, 'LANDMARK'),
+    (6, 'CITY_PIN'),
+    (7, 'STATE_COUNTRY'),
+    (8, 'MOBILE'),
+)
+
+# Placeholder cell text as openpyxl serializes it into the sheet XML
+_PLACEHOLDER_RE = re.compile(r'<t>__DC_([A-Z_]+?)__</t>')
+
+# Prepared template (parts, patched part names), set in each worker by _init_worker
+_worker_template = None
+
+# Characters that are not safe in output filenames, all mapped to '_'
+_SAFE_FILENAME_TRANS = str.maketrans({c: '_' for c in ' /\\?*:|<>"'})
 
 def first_free_cell(ws, row_idx, start_col_idx):
     """Return first non-merged cell in given row starting from start_col_idx."""
@@ -23,124 +66,223 @@ def first_free_cell(ws, row_idx, start_col_idx):
             return cell
         col_idx += 1
 
-def generate_dc_files(csv_file_path, template_path, output_dir):
+def prepare_template(template_path, date_str):
+    """
+    Fill the parts of the template that are the same for every DC and return its zip parts
+    Customer cells in the TO section hold placeholder tokens that each row swaps in the raw XML
+    Returns: (list of (part name, bytes), set of part names containing placeholders)
+    """
+    wb = load_workbook(template_path)
+    ws = wb.active
+    
+    # ===== 1) TO SECTION IN COLUMN C ===== (Exactly like working Python script)
+    # Start from column 3 (C), skip merged cells automatically
+    # The merged-cell probe runs once here per batch; rows never touch the worksheet
+    for row_idx, field in _TO_SECTION_FIELDS:
+        first_free_cell(ws, row_idx, 3).value = f"__DC_{field}__"
+    
+    # ===== 2) DC NO & DATE ===== (Like working Python script)
+    ws['B12'] = date_str   # cell next to "DC No" or "Date"
+    
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    with zipfile.ZipFile(buffer) as zf:
+        parts = [(name, zf.read(name)) for name in zf.namelist()]
+    
+    # Depending on the openpyxl version the strings land inline in the sheet or in sharedStrings.xml
+    patched_parts = set()
+    found = set()
+    for name, data in parts:
+        fields = _PLACEHOLDER_RE.findall(data.decode('utf-8', 'ignore'))
+        if fields:
+            patched_parts.add(name)
+            found.update(fields)
+    missing = {field for _, field in _TO_SECTION_FIELDS} - found
+    if missing:
+        raise ValueError(f"Template placeholders not found after save: {sorted(missing)}")
+    
+    return parts, patched_parts
+
+def _init_worker(template_parts, patched_parts):
+    """Receive the prepared template once per worker process instead of once per task"""
+    global _worker_template
+    _worker_template = (template_parts, patched_parts)
+
+def output_filenames(row_numbers, full_names, date_for_filename):
+    """
+    Build the output filename for each DC, unique across the batch
+    A repeated sanitized name gets its CSV row number appended, so no two workers share a file
+    """
+    seen = set()
+    filenames = []
+    for row_no, full_name in zip(row_numbers, full_names):
+        # ===== 3) OUTPUT FILENAME ===== (Like working Python script)
+        safe_name = str(full_name).translate(_SAFE_FILENAME_TRANS)[:25]
+        filename = f"DC_{safe_name}_{date_for_filename}.xlsx"
+        if filename in seen:
+            filename = f"DC_{safe_name}_{date_for_filename}_{row_no}.xlsx"
+        seen.add(filename)
+        filenames.append(filename)
+    return filenames
+
+def _emit_one(idx, row, output_filename, output_dir, in_memory=False):
+    """
+    Render a single DC file for one CSV record
+    Runs inside a worker process; returns the output file path, or None if skipped
+    With in_memory=True nothing is written to disk and (filename, xlsx bytes) is returned instead
+    """
+    template_parts, patched_parts = _worker_template
+    # Row is a plain tuple of the SOURCE_COLUMNS values, in that order
+    full_name, street, landmark, city, state, pincode, country, mobile = row
+    try:
+        if VERBOSE:
+            print(f"[PROCESSING] Row {idx + 1}: Filling template...")
+            print(f"[CUSTOMER] Processing: {full_name} from {city}")
+        
+        # Fill the data exactly like working Python script
+        values = {
+            'NAME': full_name,
+            'ADDRESS': street,
+            'LANDMARK': landmark or '',
+            'CITY_PIN': f"{city} - {pincode}",
+            'STATE_COUNTRY': f"{state}, {country}",
+            'MOBILE': f"{mobile}",
+        }
+        for field, value in values.items():
+            if ILLEGAL_CHARACTERS_RE.search(value):
+                raise IllegalCharacterError(f"{value!r} cannot be used in worksheets.")
+        
+        def fill(match):
+            return f'<t xml:space="preserve">{escape(values[match.group(1)])}</t>'
+        
+        output_file = io.BytesIO() if in_memory else os.path.join(output_dir, output_filename)
+        
+        # Write the file by copying the prepared template parts and only patching the
+        # customer placeholders - this preserves ALL template content:
+        # - Header "Delivery Challan" title
+        # - Logogear logo (blue background with white text)
+        # - Complete "LOGO GEAR SOLUTION LLP" company details
+        # - All table formatting and borders
+        # - Circular signature stamp at bottom
+        # - All images, logos, and styling
+        if VERBOSE:
+            print(f"[SAVE] Saving file: {output_filename}")
+        with zipfile.ZipFile(output_file, 'w', zipfile.ZIP_DEFLATED) as zf:
+            for name, data in template_parts:
+                if name in patched_parts:
+                    data = _PLACEHOLDER_RE.sub(fill, data.decode('utf-8')).encode('utf-8')
+                zf.writestr(name, data)
+        
+        if VERBOSE:
+            print(f"[SUCCESS] Generated: {output_filename}")
+        if in_memory:
+            return output_filename, output_file.getvalue()
+        return output_file
+        
+    except Exception as e:
+        print(f"[ERROR] Error processing row {idx + 1} ({full_name}): {str(e)}")
+        return None
+
+def _write_archive(output_archive, results):
+    """
+    Store rendered DC files in a single zip as they arrive from the workers
+    xlsx files are already deflated, so entries are stored without recompression
+    Entry names are unique already (see output_filenames), so every rendered DC is kept
+    Returns: list of entry names written
+    """
+    names = []
+    with zipfile.ZipFile(output_archive, 'w', zipfile.ZIP_STORED) as zf:
+        for result in results:
+            if not result:
+                continue
+            output_filename, data = result
+            zf.writestr(output_filename, data)
+            names.append(output_filename)
+    return names
+
+def generate_dc_files(csv_file_path, template_path, output_dir, output_archive=None):
     """
     Generate DC files from CSV data using the template
     Preserves ALL images, logos, and formatting from the original template
-    Returns: dict with success status and file paths
+    If output_archive is given, all DC files are stored in that single zip instead of output_dir
+    Returns: dict with success status and file paths (entry names inside the archive, if used)
     """
     try:
         # Ensure output directory exists
         os.makedirs(output_dir, exist_ok=True)
+        if output_archive is not None:
+            os.makedirs(os.path.dirname(output_archive) or '.', exist_ok=True)
         
         # Verify template exists
         if not os.path.exists(template_path):
             raise FileNotFoundError(f"Template file not found: {template_path}")
         
         # Load CSV
-        df = pd.read_csv(csv_file_path)
+        df = read_source_csv(csv_file_path, list(SOURCE_COLUMNS))
         print(f"[SUCCESS] Loaded {len(df)} records")
         print("[INFO] Columns:", df.columns.tolist())
         
+        # Cast the columns used for a DC to strings once; missing columns get their default
+        for col, default in SOURCE_COLUMNS.items():
+            if col in df.columns:
+                df[col] = df[col].astype('string').fillna('')
+            else:
+                df[col] = default
+        
+        # Skip rows where essential data is missing before any template work
+        has_essentials = df['Full Name'].str.strip().ne('') & df['City'].str.strip().ne('')
+        skipped = int((~has_essentials).sum())
+        if skipped:
+            print(f"[WARNING] Skipping {skipped} rows: Missing essential data (Full Name or City)")
+        df = df[has_essentials]
+        
         current_date = datetime.now()
         date_str = current_date.strftime('%d/%m/%Y')
         date_for_filename = current_date.strftime('%d%m%Y')
         
         generated_files = []
         
-        for idx, row in df.iterrows():
-            try:
-                # Load template for each file - this preserves ALL content including images
-                print(f"[PROCESSING] Row {idx + 1}: Loading template...")
-                wb = load_workbook(template_path)
-                ws = wb.active
-                
-                # Extract customer data
-                full_name = str(row.get('Full Name', ''))
-                street = str(row.get('Street Address', ''))
-                landmark = str(row.get('Landmark', ''))
-                city = str(row.get('City', ''))
-                state = str(row.get('State/Province', ''))
-                pincode = str(row.get('Postal Code', ''))
-                country = str(row.get('Country', 'India'))
-                mobile = str(row.get('Mobile Number', ''))
-                email = str(row.get('Email', ''))
-                
-                # Skip if essential data is missing
-                if not full_name or not city:
-                    print(f"[WARNING] Skipping row {idx + 1}: Missing essential data (Name: '{full_name}', City: '{city}')")
-                    continue
-                
-                print(f"[CUSTOMER] Processing: {full_name} from {city}")
-                
-                # ===== 1) TO SECTION IN COLUMN C ===== (Exactly like working Python script)
-                # Start from column 3 (C), skip merged cells automatically
-                print("[DATA] Filling customer data in TO section (Column C)...")
-                
-                name_cell = first_free_cell(ws, 3, 3)       # row 3, col >= C
-                addr1_cell = first_free_cell(ws, 4, 3)      # row 4, col >= C
-                landmark_cell = first_free_cell(ws, 5, 3)   # row 5, col >= C
-                citypin_cell = first_free_cell(ws, 6, 3)    # row 6, col >= C
-                statecty_cell = first_free_cell(ws, 7, 3)   # row 7, col >= C
-                mobile_cell = first_free_cell(ws, 8, 3)     # row 8, col >= C
-                email_cell = first_free_cell(ws, 9, 3)      # row 9, col >= C
-                
-                # Fill the data exactly like working Python script
-                name_cell.value = full_name
-                addr1_cell.value = street
-                landmark_cell.value = landmark or ''
-                citypin_cell.value = f"{city} - {pincode}"
-                statecty_cell.value = f"{state}, {country}"
-                mobile_cell.value = f"{mobile}"
-                #email_cell.value = f"Email: {email}"
-                
-                print(f"[SUCCESS] Filled customer data: {full_name}")
-                
-                # ===== 2) DC NO & DATE ===== (Like working Python script)
-                print("[DATE] Setting date...")
-                ws['B12'] = date_str   # cell next to "DC No" or "Date"
-                
-                # ===== 3) OUTPUT FILENAME ===== (Like working Python script)
-                safe_name = (str(full_name).replace(' ', '_')
-                           .replace('/', '_')
-                           .replace('\\', '_')
-                           .replace('?', '_')
-                           .replace('*', '_')
-                           .replace(':', '_')
-                           .replace('|', '_')
-                           .replace('<', '_')
-                           .replace('>', '_')
-                           .replace('"', '_'))[:25]
-                
-                output_filename = f"DC_{safe_name}_{date_for_filename}.xlsx"
-                output_file = os.path.join(output_dir, output_filename)
-                
-                # Save the file - this preserves ALL template content:
-                # - Header "Delivery Challan" title
-                # - Logogear logo (blue background with white text)
-                # - Complete "LOGO GEAR SOLUTION LLP" company details
-                # - All table formatting and borders
-                # - Circular signature stamp at bottom
-                # - All images, logos, and styling
-                print(f"[SAVE] Saving file: {output_filename}")
-                wb.save(output_file)
-                generated_files.append(output_file)
-                
-                print(f"[SUCCESS] Generated: {output_filename}")
-                
-            except Exception as e:
-                print(f"[ERROR] Error processing row {idx + 1} ({full_name}): {str(e)}")
-                continue
+        # Render the template once with openpyxl; rows only patch the placeholder cells
+        print("[TEMPLATE] Preparing template...")
+        template_parts, patched_parts = prepare_template(template_path, date_str)
+        
+        # Each row is independent, so rows are rendered in parallel worker processes.
+        # Plain tuples (name=None) are cheap to build and pickle to the workers
+        records = list(df[list(SOURCE_COLUMNS)].itertuples(index=False, name=None))
+        if records:
+            # Row numbers follow the source CSV, including skipped rows
+            row_numbers = [idx + 1 for idx in df.index]
+            filenames = output_filenames(row_numbers, df['Full Name'], date_for_filename)
+            emit = partial(
+                _emit_one,
+                output_dir=output_dir,
+                in_memory=output_archive is not None,
+            )
+            # Flush before forking so buffered output is not duplicated by workers
+            sys.stdout.flush()
+            max_workers = min(os.cpu_count() or 1, len(records))
+            with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_init_worker,
+                initargs=(template_parts, patched_parts),
+            ) as executor:
+                results = executor.map(emit, df.index, records, filenames, chunksize=4)
+                if output_archive is None:
+                    generated_files = [path for path in results if path]
+                else:
+                    generated_files = _write_archive(output_archive, results)
         
         print(f"[COMPLETE] Successfully generated {len(generated_files)} DC files!")
-        print("[FILES] Generated files:")
-        for file_path in generated_files:
-            print(f"   - {os.path.basename(file_path)}")
+        if VERBOSE:
+            print("[FILES] Generated files:")
+            for file_path in generated_files:
+                print(f"   - {os.path.basename(file_path)}")
         
         return {
             'success': True,
             'message': f'Generated {len(generated_files)} DC files successfully',
             'files': generated_files,
+            'archive': output_archive,
             'count': len(generated_files)
         }
         
@@ -151,24 +293,29 @@ def generate_dc_files(csv_file_path, template_path, output_dir):
             'success': False,
             'message': error_msg,
             'files': [],
+            'archive': None,
             'count': 0
         }
 
 def main():
     """Main function to handle command line arguments"""
-    if len(sys.argv) != 4:
-        print("Usage: python generate_dc.py <csv_file> <template_file> <output_dir>")
+    if len(sys.argv) not in (4, 5):
+        print("Usage: python generate_dc.py <csv_file> <template_file> <output_dir> [output_zip]")
         print("Example: python generate_dc.py data.csv DC-FORMAT.xlsx output/")
+        print("Example: python generate_dc.py data.csv DC-FORMAT.xlsx output/ output/DC_Files.zip")
         sys.exit(1)
     
     csv_file = sys.argv[1]
     template_file = sys.argv[2]
     output_dir = sys.argv[3]
+    output_archive = sys.argv[4] if len(sys.argv) == 5 else None
     
     print("[START] Starting DC Generation...")
     print(f"[CSV] CSV file: {csv_file}")
     print(f"[TEMPLATE] Template: {template_file}")
     print(f"[OUTPUT] Output directory: {output_dir}")
+    if output_archive:
+        print(f"[ARCHIVE] Output archive: {output_archive}")
     
     # Validate input files exist
     if not os.path.exists(csv_file):
@@ -180,7 +327,7 @@ def main():
         sys.exit(1)
     
     # Generate DC files
-    result = generate_dc_files(csv_file, template_file, output_dir)
+    result = generate_dc_files(csv_file, template_file, output_dir, output_archive)
     
     # Output result as JSON for Node.js to parse
     print("RESULT_JSON:", json.dumps(result))
@@ -3,10 +3,31 @@
 Setup script to install required Python packages for DC generation
 """
 
+import importlib.util
+import re
 import subprocess
 import sys
 import os
 
+# Requirement names whose import name differs from the package name
+IMPORT_NAMES = {
+    'pillow': 'PIL',
+}
+
+def missing_requirements(requirements_file):
+    """Return the requirement lines whose package cannot be imported"""
+    missing = []
+    with open(requirements_file, 'r', encoding='utf-8') as f:
+        for line in f:
+            requirement = line.split('#', 1)[0].strip()
+            if not requirement:
+                continue
+            name = re.split(r'[<>=!~;\[\s]', requirement, maxsplit=1)[0]
+            module = IMPORT_NAMES.get(name.lower(), name.replace('-', '_'))
+            if importlib.util.find_spec(module) is None:
+                missing.append(requirement)
+    return missing
+
 def install_requirements():
     """Install required Python packages"""
     try:
@@ -14,11 +35,19 @@ def install_requirements():
         script_dir = os.path.dirname(os.path.abspath(__file__))
         requirements_file = os.path.join(script_dir, 'requirements.txt')
         
-        print("Installing Python dependencies...")
+        # Skip pip entirely when everything is already importable
+        missing = missing_requirements(requirements_file)
+        if not missing:
+            print("✅ Python dependencies already installed")
+            return True
+        
+        print(f"Installing Python dependencies: {', '.join(missing)}")
         
         # Install packages
         subprocess.check_call([
-            sys.executable, '-m', 'pip', 'install', '-r', requirements_file
+            sys.executable, '-m', 'pip', 'install',
+            '--disable-pip-version-check', '--no-input',
+            '-r', requirements_file
         ])
         
         print("✅ Python dependencies installed successfully!")